@@ -0,0 +1,17 @@
+# Loaded automatically by gunicorn from the working directory
+
+
+def on_starting(server):
+    # Build (or verify) the FAISS index once in the master, before any worker forks, so
+    # workers never embed the PDF twice or rewrite files another worker has mapped
+    from new_app import ensure_index
+
+    ensure_index()
+
+
+def post_worker_init(worker):
+    # Build the RAG agent (PDF index, compiled graph, OpenAI warmup) as soon as each worker boots
+    # so the first question doesn't pay for it; done per worker because HTTP pools aren't fork-safe
+    from new_app import start_agent_warmup
+
+    start_agent_warmup()
@@ -1,109 +1,429 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import json
+import re
+import hashlib
+import gzip
+from functools import lru_cache
+import tiktoken
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numba import njit
+import faiss
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Sequence
+from langgraph.graph.message import add_messages
+from typing import Annotated, TypedDict, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
+from langchain_core.documents import Document
 from langchain_core.tools import tool
 
 # Load environment variables
 load_dotenv()
 
+# Log through a queue so formatting and stdout writes happen on a background thread, not in request handlers
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+queue_handler = QueueHandler(queue.Queue(-1))
+log_listener = None
+
+def start_log_listener():
+    """Start this process's log writer thread on a fresh queue
+
+    Threads don't survive fork, so gunicorn workers forked from the preloaded master
+    would otherwise queue records that nothing ever writes.
+    """
+    global log_listener
+    queue_handler.queue = queue.Queue(-1)
+    log_listener = QueueListener(queue_handler.queue, log_handler)
+    log_listener.start()
+
+start_log_listener()
+os.register_at_fork(after_in_child=start_log_listener)
+atexit.register(lambda: log_listener.stop())
+
+logger = logging.getLogger("rag")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+logger.addHandler(queue_handler)
+logger.propagate = False
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# System prompt, built once and shared by every LLM call
+system_prompt = """
+You are an intelligent AI assistant who answers questions about indivisible fair division and related topics.
+Use the retriever tool to look up information from the research paper.
+Always cite specific parts of the document in your answers.
+"""
+SYSTEM_MSG = SystemMessage(content=system_prompt)
+
+# Retriever sentinel; when seen, the LLM is told to answer instead of searching again
+NO_RESULTS = "No relevant information found in the research paper."
+STOP_TOOLS_MSG = SystemMessage(content="Stop calling tools; answer from conversation so far.")
+# Caps LLM -> tool round trips per question while still allowing multi-hop lookups
+RECURSION_LIMIT = 6
+
+def normalize(vectors):
+    """L2-normalize embeddings so inner product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+@njit(cache=True, fastmath=True)
+def mmr_select(sim_qd, sim_dd, k, lambda_mult):
+    """Pick k indices by maximal marginal relevance from precomputed similarities"""
+    n = sim_qd.shape[0]
+    k = min(k, n)
+    selected = np.empty(k, dtype=np.int64)
+    available = np.ones(n, dtype=np.bool_)
+    # fastmath assumes no infinities, so use a finite floor below any cosine similarity (vectors are normalized)
+    floor = -2.0
+    # Highest similarity to any already selected document
+    max_sim_selected = np.full(n, floor)
+
+    for step in range(k):
+        best = -1
+        best_score = floor
+        for i in range(n):
+            if not available[i]:
+                continue
+            if step == 0:
+                score = sim_qd[i]
+            else:
+                score = lambda_mult * sim_qd[i] - (1 - lambda_mult) * max_sim_selected[i]
+            if best == -1 or score > best_score:
+                best = i
+                best_score = score
+        selected[step] = best
+        available[best] = False
+        for i in range(n):
+            if sim_dd[i, best] > max_sim_selected[i]:
+                max_sim_selected[i] = sim_dd[i, best]
+    return selected
+
+# Compile (or load from the on-disk cache) at import rather than on the first question
+mmr_select(np.ones(2, dtype=np.float32), np.ones((2, 2), dtype=np.float32), 1, 0.5)
+
+# Token-aware chunking: split to pieces below piece_tokens, then greedily merge to max_tokens
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    # Loaded on first use: tiktoken downloads the BPE file the first time it is needed
+    return tiktoken.encoding_for_model("text-embedding-3-small")
+
+def count_tokens(text):
+    return len(get_tokenizer().encode(text))
+
+def split_to_pieces(text, piece_tokens, separators=SEPARATORS):
+    """Recursively split text on coarser-to-finer separators until every piece fits"""
+    if count_tokens(text) <= piece_tokens:
+        return [text]
+    if not separators:
+        # No separator left: cut on token boundaries
+        tokens = get_tokenizer().encode(text)
+        return [get_tokenizer().decode(tokens[i:i + piece_tokens]) for i in range(0, len(tokens), piece_tokens)]
+
+    sep, finer = separators[0], separators[1:]
+    parts = text.split(sep)
+    pieces = []
+    for i, part in enumerate(parts):
+        # Keep the separator so merged chunks read like the original text
+        if i < len(parts) - 1:
+            part += sep
+        if part.strip():
+            pieces.extend(split_to_pieces(part, piece_tokens, finer))
+    return pieces
+
+def merge_pieces(pieces, max_tokens, overlap_tokens):
+    """Greedily merge adjacent pieces up to max_tokens, carrying a token overlap between chunks
+
+    Returns (overlap, body) pairs: the tail repeated from the previous chunk and the chunk's own new text.
+    """
+    tokenizer = get_tokenizer()
+    chunks = []
+    overlap, body = "", ""
+    for piece in pieces:
+        if body and count_tokens(overlap + body + piece) > max_tokens:
+            chunks.append((overlap, body))
+            tail = tokenizer.encode(overlap + body)[-overlap_tokens:] if overlap_tokens > 0 else []
+            overlap, body = tokenizer.decode(tail), ""
+            if count_tokens(overlap + piece) > max_tokens:
+                overlap = ""
+        body += piece
+    if body.strip():
+        chunks.append((overlap, body))
+    return chunks
+
+def fold_tiny_chunks(chunks, max_tokens, min_tokens):
+    """Fold chunks with under min_tokens of new text into their predecessor when the result still fits
+
+    Takes (overlap, body, starts_document, metadata) tuples and returns (text, metadata) pairs.
+    Within a document the predecessor already ends with the chunk's overlap, so only the body is
+    appended; a chunk that starts a new document is joined with a paragraph break.
+    """
+    folded = []
+    for overlap, body, starts_document, metadata in chunks:
+        if folded and count_tokens(body) < min_tokens:
+            candidate = folded[-1][0] + ("\n\n" if starts_document else "") + body
+            if count_tokens(candidate) <= max_tokens:
+                folded[-1][0] = candidate
+                continue
+        folded.append([overlap + body, metadata])
+    return [(text, metadata) for text, metadata in folded]
+
+def split_documents_by_tokens(documents, max_tokens=1000, piece_tokens=800, overlap_tokens=100, min_tokens=100):
+    """Split-then-merge chunking of each document; a folded chunk keeps its first document's metadata"""
+    chunks = []
+    for doc in documents:
+        pieces = split_to_pieces(doc.page_content, piece_tokens)
+        for i, (overlap, body) in enumerate(merge_pieces(pieces, max_tokens, overlap_tokens)):
+            chunks.append((overlap, body, i == 0, doc.metadata))
+    return [
+        Document(page_content=text, metadata=dict(metadata))
+        for text, metadata in fold_tiny_chunks(chunks, max_tokens, min_tokens)
+    ]
+
+def dedupe_chunks(documents):
+    """Drop chunks whose normalized text was already seen (repeated headers, footers, references)"""
+    seen = set()
+    unique = []
+    for doc in documents:
+        fingerprint = hashlib.sha1(re.sub(r"\s+", " ", doc.page_content).strip().lower().encode("utf-8")).digest()
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            unique.append(doc)
+    return unique
+
+# Ingestion settings shared by the one-off index build and every agent
+PDF_PATH = "research1.pdf"
+PERSIST_DIRECTORY = r"C:\Users\saabd\Desktop\langGraph"
+INDEX_NAME = "research_stuff"
+CHUNK_SIZE, CHUNK_OVERLAP = 1000, 100  # in tokens
+EMBEDDING_MODEL = "text-embedding-3-small"
+# 512-d Matryoshka truncation: 3x smaller vectors than the 1536-d default
+EMBEDDING_DIMENSIONS = 512
+INDEX_PATH = os.path.join(PERSIST_DIRECTORY, f"{INDEX_NAME}.faiss")
+CHUNKS_PATH = os.path.join(PERSIST_DIRECTORY, f"{INDEX_NAME}.chunks.json")
+SIDECAR_PATH = os.path.join(PERSIST_DIRECTORY, "ingested.json")
+
+def make_embeddings(**clients):
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, **clients)
+
+async def embed_texts(texts, batch_size=200, max_concurrency=8):
+    """Embed texts in batches concurrently, bounded to max_concurrency in-flight requests
+
+    Uses its own HTTP client, closed before returning, so building the index in the gunicorn
+    master leaves no open connections for forked workers to inherit.
+    """
+    async with httpx.AsyncClient(http2=True, timeout=60) as client:
+        embeddings = make_embeddings(http_async_client=client)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def embed_one(batch):
+            async with semaphore:
+                return await embeddings.aembed_documents(batch)
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(embed_one(batch) for batch in batches))
+    return [v for batch_vectors in results for v in batch_vectors]
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def write_atomically(path, write):
+    """Write through a temp file and rename it into place
+
+    Readers never see a partial file, and a process that already mapped the old index keeps
+    its (unlinked) copy instead of having the file truncated under the mapping.
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def ensure_index():
+    """Build the FAISS index and chunk map unless the copy on disk matches the PDF and settings"""
+    if not os.path.exists(PDF_PATH):
+        raise FileNotFoundError(f"PDF file not found: {PDF_PATH}")
+
+    if not os.path.exists(PERSIST_DIRECTORY):
+        os.makedirs(PERSIST_DIRECTORY)
+
+    # Fingerprint of the PDF and chunking params; a mismatch forces re-ingestion
+    with open(PDF_PATH, "rb") as f:
+        pdf_sha256 = hashlib.sha256(f.read()).hexdigest()
+    ingest_key = {
+        "pdf_sha256": pdf_sha256,
+        "chunker": "tokens",
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "dedupe": "sha1",
+        "index_name": INDEX_NAME,
+        "index": "faiss-flat-ip",
+        "embedding_dimensions": EMBEDDING_DIMENSIONS,
+    }
+    previous_key = None
+    if os.path.exists(SIDECAR_PATH):
+        with open(SIDECAR_PATH) as f:
+            previous_key = json.load(f)
+
+    if previous_key == ingest_key and os.path.exists(INDEX_PATH) and os.path.exists(CHUNKS_PATH):
+        logger.info("Reusing existing FAISS index")
+        return
+
+    pdf_loader = PyPDFLoader(PDF_PATH)
+    pages = pdf_loader.load()
+    logger.info("PDF loaded with %d pages", len(pages))
+
+    # Text Chunking
+    pages_split = split_documents_by_tokens(pages, max_tokens=CHUNK_SIZE, overlap_tokens=CHUNK_OVERLAP)
+    chunk_count = len(pages_split)
+    pages_split = dedupe_chunks(pages_split)
+    logger.info("Dropped %d duplicate chunks, embedding %d", chunk_count - len(pages_split), len(pages_split))
+
+    # Vectors are normalized so inner product ranks like cosine
+    vectors = normalize(asyncio.run(embed_texts([doc.page_content for doc in pages_split])))
+    index = faiss.IndexFlatIP(EMBEDDING_DIMENSIONS)
+    index.add(vectors)
+
+    write_atomically(INDEX_PATH, lambda path: faiss.write_index(index, path))
+    # Index position -> chunk text and metadata
+    chunks = [{"text": doc.page_content, "metadata": doc.metadata} for doc in pages_split]
+    write_atomically(CHUNKS_PATH, lambda path: write_json(path, chunks))
+    # Sidecar last: a matching key means both files above are complete
+    write_atomically(SIDECAR_PATH, lambda path: write_json(path, ingest_key))
+    logger.info("FAISS vector index created!")
+
 # Initialize your RAG agent (same code as before)
 class RAGAgent:
     def __init__(self):
-        # LLM & Embeddings
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0)
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        
-        # PDF Loading
-        pdf_path = "research1.pdf"
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-
-        pdf_loader = PyPDFLoader(pdf_path)
-        pages = pdf_loader.load()
-        print(f"PDF loaded with {len(pages)} pages")
-
-        # Text Chunking
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        pages_split = text_splitter.split_documents(pages)
-
-        # Chroma Vector Store
-        persist_directory = r"C:\Users\saabd\Desktop\langGraph"
-        collection_name = "research_stuff"
-
-        if not os.path.exists(persist_directory):
-            os.makedirs(persist_directory)
-
-        vectorstore = Chroma.from_documents(
-            documents=pages_split,
-            embedding=self.embeddings,
-            persist_directory=persist_directory,
-            collection_name=collection_name
+        # One keepalive HTTP/2 pool shared by every OpenAI call
+        self.http_client = httpx.Client(
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
         )
-        print("ChromaDB vector store created!")
 
-        self.retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5}
-        )
+        # LLM & Embeddings
+        self.llm = ChatOpenAI(model="gpt-4o", temperature=0, http_client=self.http_client)
+        self.embeddings = make_embeddings(http_client=self.http_client)
+
+        # FAISS Vector Index (read-only after ingest, memory-mapped at boot). Under gunicorn the
+        # master already built it in on_starting, so this only checks the fingerprint
+        ensure_index()
+
+        # Map the index instead of loading it onto the heap. Only IO_FLAG_MMAP_IFC maps flat codes
+        # (IO_FLAG_MMAP covers IVF inverted lists only); older faiss builds without it load normally
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if mmap_flag is not None:
+            self.index = faiss.read_index(INDEX_PATH, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        else:
+            self.index = faiss.read_index(INDEX_PATH)
+        with open(CHUNKS_PATH) as f:
+            self.chunks = [chunk["text"] for chunk in json.load(f)]
+        logger.info("FAISS index loaded with %d chunks", self.index.ntotal)
+
+        # Retrieval settings: MMR over the top fetch_k similarity hits
+        self.embed_query = self.embeddings.embed_query
+        self.k = 5
+        self.fetch_k = 25
+        self.mmr_lambda = 0.5
+        # Optional cosine-similarity floor for hits. Off by default: text-embedding-3 scores cluster in a narrow
+        # band that shifts with the corpus and dimensions, so a useful cutoff has to be measured on this paper
+        cutoff = os.getenv("RETRIEVAL_MIN_SIMILARITY")
+        self.min_similarity = float(cutoff) if cutoff else None
         
         # Setup tools and graph
         self.setup_agent()
 
-    @tool
-    def retriever_tool(self, query: str) -> str:
-        """
-        This tool searches and returns information from the research paper PDF.
-        """
-        docs = self.retriever.get_relevant_documents(query)
-        if not docs:
-            return "No relevant information found in the research paper."
-        return "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)])
+    @lru_cache(maxsize=512)
+    def _retrieve(self, query: str) -> str:
+        """Embed the query, run MMR retrieval and format the matching chunks"""
+        # Embed once and search the index directly; inner product of normalized vectors is cosine similarity
+        q_emb = normalize(self.embed_query(query))
+        scores, ids = self.index.search(q_emb[None, :], self.fetch_k)
+        # FAISS pads missing hits with id -1; an opt-in cutoff also drops weak matches
+        keep = ids[0] >= 0
+        if self.min_similarity is not None:
+            keep &= scores[0] >= self.min_similarity
+        ids = ids[0][keep]
+        if len(ids) == 0:
+            return NO_RESULTS
+        candidates = [self.chunks[i] for i in ids]
+
+        # Stored vectors are already normalized; precompute all similarities before selection
+        emb = self.index.reconstruct_batch(ids)
+        sim_qd = emb @ q_emb
+        sim_dd = emb @ emb.T
+
+        selected = mmr_select(sim_qd, sim_dd, self.k, self.mmr_lambda)
+        docs = [candidates[i] for i in selected]
+        return "\n\n".join([f"Document {i+1}:\n{doc}" for i, doc in enumerate(docs)])
 
     def setup_agent(self):
-        tools = [self.retriever_tool]
+        # Built per agent as a closure: @tool on a method would drop `self` and fail on every call
+        @tool
+        def retriever_tool(query: str) -> str:
+            """
+            This tool searches and returns information from the research paper PDF.
+            """
+            # Canonicalize case and whitespace only; punctuation carries meaning here ("1/2-MMS", "3.5")
+            canonical_query = re.sub(r"\s+", " ", query.strip().lower())
+            return self._retrieve(canonical_query)
+
+        tools = [retriever_tool]
         self.tools_dict = {t.name: t for t in tools}
+        self._tool_names = frozenset(self.tools_dict)
+        # The model can only emit tool_calls for tools it has been given
+        self.llm_with_tools = self.llm.bind_tools(tools)
 
         # Agent State
         class AgentState(TypedDict):
-            messages: Sequence[BaseMessage]
+            # add_messages appends each node's output, so the LLM sees the question, its own tool calls and their results
+            messages: Annotated[Sequence[BaseMessage], add_messages]
 
         def should_continue(state: AgentState):
             last_message = state['messages'][-1]
             return hasattr(last_message, 'tool_calls') and len(last_message.tool_calls) > 0
 
         # LLM Call
-        system_prompt = """
-        You are an intelligent AI assistant who answers questions about indivisible fair division and related topics.
-        Use the retriever tool to look up information from the research paper.
-        Always cite specific parts of the document in your answers.
-        """
-
         def call_llm(state: AgentState) -> AgentState:
-            messages = [SystemMessage(content=system_prompt)] + list(state['messages'])
-            message = self.llm.invoke(messages)
+            message = self.llm_with_tools.invoke((SYSTEM_MSG, *state['messages']))
             return {'messages': [message]}
 
         # Tool Execution
+        def run_tool(t):
+            if t['name'] not in self._tool_names:
+                return "Incorrect Tool Name, please use the available tool."
+            try:
+                return self.tools_dict[t['name']].invoke(t['args'].get('query', ''))
+            except Exception as e:
+                # Report the failure to the LLM without cancelling sibling tool calls
+                logger.error("Error in tool %s: %s", t['name'], e)
+                return f"Tool {t['name']} failed: {e}"
+
         def take_action(state: AgentState) -> AgentState:
             tool_calls = state['messages'][-1].tool_calls
-            results = []
-            for t in tool_calls:
-                if t['name'] not in self.tools_dict:
-                    result = "Incorrect Tool Name, please use the available tool."
-                else:
-                    result = self.tools_dict[t['name']].invoke(t['args'].get('query', ''))
-                results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
+            # Tool calls are I/O-bound (embedding HTTP), so run them concurrently
+            with ThreadPoolExecutor(max_workers=min(8, len(tool_calls))) as executor:
+                outputs = list(executor.map(run_tool, tool_calls))
+            results = [
+                ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result))
+                for t, result in zip(tool_calls, outputs)
+            ]
+            if NO_RESULTS in outputs:
+                results.append(STOP_TOOLS_MSG)
             return {'messages': results}
 
         # State Graph
@@ -115,20 +435,77 @@ class RAGAgent:
         graph.set_entry_point("llm")
         self.rag_agent = graph.compile()
 
+        if os.getenv("WARMUP", "1") == "1":
+            self.warmup()
+
+    def warmup(self):
+        """Prime LangGraph's lazy paths and open the OpenAI keepalive connections before the first question"""
+        try:
+            self.embeddings.embed_query("warmup")
+            self.rag_agent.invoke(
+                {"messages": [HumanMessage(content="warmup")]},
+                config={"recursion_limit": 2}
+            )
+        except Exception as e:
+            # Hitting the recursion limit (or a transient API error) is fine for a warmup
+            logger.info("RAG agent warmup stopped early: %s", e)
+
     def ask_question(self, question: str) -> str:
         """Ask a question to the RAG agent and return the response"""
         try:
             messages = [HumanMessage(content=question)]
-            result = self.rag_agent.invoke({"messages": messages})
+            result = self.rag_agent.invoke({"messages": messages}, config={"recursion_limit": RECURSION_LIMIT})
             return result['messages'][-1].content
         except Exception as e:
-            print(f"Error in RAG agent: {e}")
+            logger.error("Error in RAG agent: %s", e)
             return "I'm sorry, I encountered an error while processing your question. Please try again."
 
-# Initialize RAG agent
-print("Initializing RAG Agent...")
-rag_agent = RAGAgent()
-print("RAG Agent initialized successfully!")
+    def stream_answer(self, question: str):
+        """Yield the final answer token by token as the LLM generates it"""
+        messages = [HumanMessage(content=question)]
+        for chunk, metadata in self.rag_agent.stream(
+            {"messages": messages},
+            config={"recursion_limit": RECURSION_LIMIT},
+            stream_mode="messages"
+        ):
+            # Only forward text from the LLM node; tool output and tool-call chunks are skipped
+            if metadata.get("langgraph_node") == "llm" and isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
+
+# Initialize RAG agent lazily, once per process
+@lru_cache(maxsize=1)
+def _build_agent() -> RAGAgent:
+    logger.info("Initializing RAG Agent...")
+    agent = RAGAgent()
+    logger.info("RAG Agent initialized successfully!")
+    return agent
+
+# Created on first use in the serving process. Under gunicorn --preload this module is imported
+# before gevent patches threading, and a real OS lock held by the warmup greenlet across network
+# I/O would block the worker's only thread as soon as a request waited on it.
+_agent_lock = None
+# Only held for the instant it takes to create _agent_lock, never across I/O
+_agent_lock_guard = threading.Lock()
+
+def _reset_agent_lock():
+    global _agent_lock
+    _agent_lock = None
+
+os.register_at_fork(after_in_child=_reset_agent_lock)
+
+def get_agent() -> RAGAgent:
+    # Requests arriving while the boot-time warmup is still building the agent wait for it instead of building a second one
+    global _agent_lock
+    if _agent_lock is None:
+        with _agent_lock_guard:
+            if _agent_lock is None:
+                _agent_lock = threading.Lock()
+    with _agent_lock:
+        return _build_agent()
+
+def start_agent_warmup():
+    """Build (and so warm up) the agent in the background when a worker boots, off the request path"""
+    threading.Thread(target=get_agent, name="agent-warmup", daemon=True).start()
 
 # HTML template for the chat interface
 HTML_TEMPLATE = """
@@ -444,10 +821,18 @@ HTML_TEMPLATE = """
                 this.setInputState(false);
                 this.showTypingIndicator();
 
+                let botMessage = null;
                 try {
-                    const response = await this.callRAGAgent(question);
+                    await this.callRAGAgent(question, (delta) => {
+                        // Replace the typing indicator with the answer on the first token
+                        if (!botMessage) {
+                            this.hideTypingIndicator();
+                            botMessage = this.addMessage('', 'bot');
+                        }
+                        botMessage.textContent += delta;
+                        this.scrollToBottom();
+                    });
                     this.hideTypingIndicator();
-                    this.addMessage(response, 'bot');
                 } catch (error) {
                     this.hideTypingIndicator();
                     this.addMessage('Sorry, I encountered an error while processing your question. Please try again.', 'error');
@@ -458,21 +843,28 @@ HTML_TEMPLATE = """
                 }
             }
 
-            async callRAGAgent(question) {
-                const response = await fetch('/ask', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ question: question })
+            callRAGAgent(question, onDelta) {
+                return new Promise((resolve, reject) => {
+                    const source = new EventSource('/ask_stream?question=' + encodeURIComponent(question));
+
+                    source.onmessage = (event) => {
+                        const data = JSON.parse(event.data);
+                        if (data.delta) {
+                            onDelta(data.delta);
+                        } else if (data.done) {
+                            source.close();
+                            resolve();
+                        } else if (data.error) {
+                            source.close();
+                            reject(new Error(data.error));
+                        }
+                    };
+
+                    source.onerror = () => {
+                        source.close();
+                        reject(new Error('Stream connection failed'));
+                    };
                 });
-                
-                if (!response.ok) {
-                    throw new Error('Network response was not ok');
-                }
-                
-                const data = await response.json();
-                return data.answer;
             }
 
             addMessage(content, type) {
@@ -482,6 +874,7 @@ HTML_TEMPLATE = """
                 
                 this.chatMessages.appendChild(messageDiv);
                 this.scrollToBottom();
+                return messageDiv;
             }
 
             showTypingIndicator() {
@@ -515,10 +908,30 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# The page has no template variables, so encode, compress and hash it once
+HOME_HTML = HTML_TEMPLATE.encode("utf-8")
+HOME_HTML_GZIP = gzip.compress(HOME_HTML)
+HOME_ETAG = hashlib.md5(HOME_HTML).hexdigest()
+# Each encoding is a distinct representation and needs its own strong ETag
+HOME_ETAG_GZIP = HOME_ETAG + "-gz"
+
 @app.route('/')
 def home():
     """Serve the chat interface"""
-    return render_template_string(HTML_TEMPLATE)
+    gzipped = 'gzip' in request.accept_encodings
+    etag = HOME_ETAG_GZIP if gzipped else HOME_ETAG
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'public, max-age=3600',
+        'Vary': 'Accept-Encoding'
+    }
+    if gzipped:
+        headers['Content-Encoding'] = 'gzip'
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    body = HOME_HTML_GZIP if gzipped else HOME_HTML
+    return Response(body, mimetype='text/html', headers=headers)
 
 @app.route('/ask', methods=['POST'])
 def ask_question():
@@ -530,12 +943,14 @@ def ask_question():
         if not question:
             return jsonify({'error': 'No question provided'}), 400
         
-        print(f"Received question: {question}")
+        logger.info("Received question: %s", question)
         
         # Get response from RAG agent
-        answer = rag_agent.ask_question(question)
+        answer = get_agent().ask_question(question)
         
-        print(f"RAG Agent response: {answer}")
+        # Full answers are only worth formatting when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("RAG Agent response: %s", answer)
         
         return jsonify({
             'answer': answer,
@@ -543,12 +958,36 @@ def ask_question():
         })
     
     except Exception as e:
-        print(f"Error in ask_question endpoint: {e}")
+        logger.error("Error in ask_question endpoint: %s", e)
         return jsonify({
             'error': 'An error occurred while processing your question',
             'status': 'error'
         }), 500
 
+@app.route('/ask_stream')
+def ask_stream():
+    """Stream the answer to the chat interface as Server-Sent Events"""
+    question = request.args.get('question', '').strip()
+
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+
+    logger.info("Received question: %s", question)
+
+    def generate():
+        try:
+            for delta in get_agent().stream_answer(question):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+        except Exception as e:
+            logger.error("Error in ask_stream endpoint: %s", e)
+            yield f"data: {json.dumps({'error': 'An error occurred while processing your question'})}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -557,8 +996,15 @@ def health_check():
         'message': 'RAG Agent is running'
     })
 
+# Development server only; production runs under gunicorn (see Procfile)
 if __name__ == '__main__':
+    # The debug reloader runs a second process and rebuilds the agent on every file change, so it is opt-in
+    dev = os.getenv("DEV") == "1"
+    # With the reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if not dev or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        start_agent_warmup()
     print("Starting Flask server...")
     print("Chat interface will be available at: http://localhost:5000")
     print("API endpoint available at: http://localhost:5000/ask")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    print("Streaming endpoint available at: http://localhost:5000/ask_stream")
+    app.run(debug=dev, host='0.0.0.0', port=5000)
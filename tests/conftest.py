@@ -0,0 +1,70 @@
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+# new_app.py lives at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import new_app  # noqa: E402
+
+
+class StubEmbedder:
+    """Maps known queries to fixed vectors and counts embedding calls"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return self.vectors[text]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replays canned replies (the last one repeats) and records every prompt it was sent"""
+
+    responses: list = Field(default_factory=lambda: [AIMessage(content="ok")])
+    calls: list = Field(default_factory=list)
+    bound_tool_names: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound_tool_names = [t.name for t in tools]
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        reply = self.responses[min(len(self.calls), len(self.responses) - 1)]
+        self.calls.append(list(messages))
+        # Fresh id each time so the graph's add_messages reducer appends repeats instead of replacing them
+        return ChatResult(generations=[ChatGeneration(message=reply.model_copy(update={"id": None}))])
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    """Build a RAGAgent over an in-memory flat index without touching the PDF or OpenAI"""
+    monkeypatch.setenv("WARMUP", "0")
+
+    def build(chunk_vectors, query_vectors, llm=None):
+        vectors = new_app.normalize(chunk_vectors)
+        agent = new_app.RAGAgent.__new__(new_app.RAGAgent)
+        agent.index = faiss.IndexFlatIP(vectors.shape[1])
+        agent.index.add(vectors)
+        agent.chunks = [f"chunk {i}" for i in range(len(vectors))]
+        agent.embed_query = StubEmbedder({q: np.asarray(v, dtype=np.float32) for q, v in query_vectors.items()})
+        agent.k, agent.fetch_k, agent.mmr_lambda = 5, 25, 0.5
+        agent.min_similarity = None
+        agent.llm = llm if llm is not None else ScriptedChatModel()
+        agent.setup_agent()
+        return agent
+
+    return build
@@ -0,0 +1,54 @@
+import numpy as np
+
+import new_app
+from conftest import ScriptedChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+CHUNKS = np.eye(8)
+QUERIES = {"envy": CHUNKS[3], "unrelated": -np.ones(8)}
+
+
+def tool_call(query, call_id="call_1"):
+    return AIMessage(content="", tool_calls=[{"name": "retriever_tool", "args": {"query": query}, "id": call_id}])
+
+
+def test_llm_is_given_the_retriever_tool(make_agent):
+    agent = make_agent(CHUNKS, QUERIES)
+
+    assert agent.llm.bound_tool_names == ["retriever_tool"]
+
+
+def test_tool_call_results_reach_the_next_llm_turn(make_agent):
+    llm = ScriptedChatModel(responses=[tool_call("envy"), AIMessage(content="final answer")])
+    agent = make_agent(CHUNKS, QUERIES, llm=llm)
+
+    assert agent.ask_question("What is envy-freeness?") == "final answer"
+
+    second_prompt = llm.calls[1]
+    assert isinstance(second_prompt[1], HumanMessage)
+    assert second_prompt[2].tool_calls[0]["id"] == "call_1"
+    assert isinstance(second_prompt[3], ToolMessage)
+    assert second_prompt[3].content.startswith("Document 1:\nchunk 3")
+
+
+def test_llm_that_never_stops_calling_tools_is_cut_off(make_agent):
+    llm = ScriptedChatModel(responses=[tool_call("envy")])
+    agent = make_agent(CHUNKS, QUERIES, llm=llm)
+
+    answer = agent.ask_question("What is envy-freeness?")
+
+    # llm -> tool steps alternate, so RECURSION_LIMIT = 6 allows three LLM turns
+    assert len(llm.calls) == new_app.RECURSION_LIMIT // 2
+    assert answer.startswith("I'm sorry")
+
+
+def test_empty_retrieval_tells_the_llm_to_stop_calling_tools(make_agent):
+    llm = ScriptedChatModel(responses=[tool_call("unrelated"), AIMessage(content="not in the paper")])
+    agent = make_agent(CHUNKS, QUERIES, llm=llm)
+    agent.min_similarity = 0.5
+
+    assert agent.ask_question("Who won the 1998 World Cup?") == "not in the paper"
+
+    second_prompt = llm.calls[1]
+    assert second_prompt[3].content == new_app.NO_RESULTS
+    assert second_prompt[-1].content == new_app.STOP_TOOLS_MSG.content
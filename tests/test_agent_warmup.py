@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip("gevent")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: gevent monkey-patching cannot be undone inside the test process
+SCRIPT = textwrap.dedent("""
+    import sys, time
+    sys.path.insert(0, {root!r})
+    import new_app  # imported before patching, as in the gunicorn --preload master
+
+    from gevent import monkey
+    monkey.patch_all()
+    import gevent
+
+    built = []
+
+    class SlowAgent:
+        def __init__(self):
+            built.append(self)
+            time.sleep(0.2)  # patched sleep yields, like the embedding and gpt-4o calls in warmup
+
+    new_app.RAGAgent = SlowAgent
+    new_app.start_agent_warmup()  # what gunicorn.conf.py's post_worker_init does
+    gevent.sleep(0.01)  # let the warmup greenlet start building and yield
+
+    with gevent.Timeout(5):
+        agent = new_app.get_agent()  # a request arriving mid-warmup
+
+    assert len(built) == 1 and agent is built[0], built
+    print("ok")
+""")
+
+
+def test_request_during_gevent_warmup_waits_for_the_same_agent():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(root=ROOT)],
+        capture_output=True, text=True, timeout=60, env=dict(os.environ, WARMUP="0")
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+import new_app
+from langchain_core.documents import Document
+
+
+class WordTokenizer:
+    """Offline stand-in for tiktoken: one token per word plus its trailing whitespace"""
+
+    def encode(self, text):
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    monkeypatch.setattr(new_app, "get_tokenizer", WordTokenizer)
+
+
+def make_text(words, paragraph_every=37):
+    return "".join(
+        f"w{i}" + ("\n\n" if i % paragraph_every == paragraph_every - 1 else " ")
+        for i in range(words)
+    )
+
+
+def test_split_to_pieces_fits_and_preserves_text():
+    text = make_text(3000) + "x" * 50  # trailing unbreakable word
+    pieces = new_app.split_to_pieces(text, piece_tokens=80)
+
+    assert all(new_app.count_tokens(p) <= 80 for p in pieces)
+    assert "".join(pieces) == text
+
+
+def test_merge_pieces_respects_cap_and_carries_overlap():
+    pieces = new_app.split_to_pieces(make_text(3000), piece_tokens=80)
+    chunks = new_app.merge_pieces(pieces, max_tokens=100, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    assert "".join(body for _, body in chunks) == "".join(pieces)
+    for (prev_overlap, prev_body), (overlap, body) in zip(chunks, chunks[1:]):
+        assert new_app.count_tokens(overlap + body) <= 100
+        assert (prev_overlap + prev_body).endswith(overlap)
+        assert new_app.count_tokens(overlap) <= 10
+
+
+@pytest.mark.parametrize("overlap_tokens", [0, 20, 100])
+def test_split_documents_never_exceeds_max_tokens(overlap_tokens):
+    pages = [Document(page_content=make_text(n), metadata={"page": p})
+             for p, n in enumerate([1500, 30, 900, 5, 2500])]
+    chunks = new_app.split_documents_by_tokens(
+        pages, max_tokens=1000, piece_tokens=800, overlap_tokens=overlap_tokens, min_tokens=100
+    )
+
+    assert all(new_app.count_tokens(c.page_content) <= 1000 for c in chunks)
+
+
+def test_tiny_page_folds_into_previous_chunk_once():
+    pages = [
+        Document(page_content=make_text(300), metadata={"page": 0}),
+        Document(page_content="tiny tail page", metadata={"page": 1}),
+    ]
+    chunks = new_app.split_documents_by_tokens(pages, max_tokens=1000, overlap_tokens=100, min_tokens=100)
+
+    assert len(chunks) == 1
+    assert chunks[0].page_content == pages[0].page_content + "\n\n" + "tiny tail page"
+    assert chunks[0].metadata == {"page": 0}
+
+
+def test_tiny_page_is_kept_when_folding_would_exceed_max_tokens():
+    pages = [
+        Document(page_content=make_text(999), metadata={"page": 0}),
+        Document(page_content="tiny tail page", metadata={"page": 1}),
+    ]
+    chunks = new_app.split_documents_by_tokens(pages, max_tokens=1000, overlap_tokens=100, min_tokens=100)
+
+    assert [c.page_content for c in chunks] == [pages[0].page_content, "tiny tail page"]
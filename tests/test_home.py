@@ -0,0 +1,51 @@
+import gzip
+
+import pytest
+
+import new_app
+
+
+@pytest.fixture
+def client():
+    return new_app.app.test_client()
+
+
+def test_home_serves_gzip_when_accepted(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == f'"{new_app.HOME_ETAG_GZIP}"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data) == new_app.HOME_HTML
+
+
+def test_home_serves_identity_otherwise(client):
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == f'"{new_app.HOME_ETAG}"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.data == new_app.HOME_HTML
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_home_matching_etag_is_not_modified(client, accept_encoding):
+    etag = client.get("/", headers={"Accept-Encoding": accept_encoding}).headers["ETag"]
+
+    response = client.get("/", headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize("cached, requested", [("gzip", "identity"), ("identity", "gzip")])
+def test_home_etag_from_other_encoding_gets_full_body(client, cached, requested):
+    etag = client.get("/", headers={"Accept-Encoding": cached}).headers["ETag"]
+
+    response = client.get("/", headers={"Accept-Encoding": requested, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,72 @@
+import json
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+import new_app
+from langchain_core.documents import Document
+
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch):
+    """Point ingestion at a temp directory with a stub PDF loader and embedder"""
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF-1.4 stub")
+    store = tmp_path / "store"
+    monkeypatch.setattr(new_app, "PDF_PATH", str(pdf))
+    monkeypatch.setattr(new_app, "PERSIST_DIRECTORY", str(store))
+    monkeypatch.setattr(new_app, "INDEX_PATH", str(store / "idx.faiss"))
+    monkeypatch.setattr(new_app, "CHUNKS_PATH", str(store / "idx.chunks.json"))
+    monkeypatch.setattr(new_app, "SIDECAR_PATH", str(store / "ingested.json"))
+    monkeypatch.setattr(new_app, "EMBEDDING_DIMENSIONS", 4)
+    monkeypatch.setattr(new_app, "split_documents_by_tokens", lambda pages, **kwargs: pages)
+
+    class StubLoader:
+        def __init__(self, path):
+            pass
+
+        def load(self):
+            return [Document(page_content=f"page {i}", metadata={"page": i}) for i in range(3)]
+
+    embedded = []
+
+    async def stub_embed_texts(texts):
+        embedded.append(list(texts))
+        return [np.eye(4)[i].tolist() for i in range(len(texts))]
+
+    monkeypatch.setattr(new_app, "PyPDFLoader", StubLoader)
+    monkeypatch.setattr(new_app, "embed_texts", stub_embed_texts)
+    return store, pdf, embedded
+
+
+def test_ensure_index_writes_complete_files_without_temp_leftovers(ingest_env):
+    store, _, embedded = ingest_env
+
+    new_app.ensure_index()
+
+    assert sorted(os.listdir(store)) == ["idx.chunks.json", "idx.faiss", "ingested.json"]
+    assert faiss.read_index(new_app.INDEX_PATH).ntotal == 3
+    with open(new_app.CHUNKS_PATH) as f:
+        assert [c["text"] for c in json.load(f)] == ["page 0", "page 1", "page 2"]
+    assert len(embedded) == 1
+
+
+def test_ensure_index_reuses_matching_index(ingest_env):
+    _, _, embedded = ingest_env
+
+    new_app.ensure_index()
+    new_app.ensure_index()
+
+    assert len(embedded) == 1
+
+
+def test_ensure_index_rebuilds_when_pdf_changes(ingest_env):
+    _, pdf, embedded = ingest_env
+
+    new_app.ensure_index()
+    pdf.write_bytes(b"%PDF-1.4 revised")
+    new_app.ensure_index()
+
+    assert len(embedded) == 2
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import new_app
+
+
+def reference_mmr(sim_qd, sim_dd, k, lambda_mult):
+    """Straightforward MMR: relevance first, then relevance minus redundancy with the picks so far"""
+    selected = []
+    for _ in range(min(k, len(sim_qd))):
+        best, best_score = None, None
+        for i in range(len(sim_qd)):
+            if i in selected:
+                continue
+            if selected:
+                score = lambda_mult * sim_qd[i] - (1 - lambda_mult) * max(sim_dd[i, j] for j in selected)
+            else:
+                score = sim_qd[i]
+            if best is None or score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+def similarities(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    emb = new_app.normalize(rng.normal(size=(n, dim)))
+    query = new_app.normalize(emb[0] + 0.1 * rng.normal(size=dim))
+    return emb @ query, emb @ emb.T
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.5, 1.0])
+def test_mmr_select_matches_reference(seed, lambda_mult):
+    sim_qd, sim_dd = similarities(25, 16, seed)
+
+    selected = new_app.mmr_select(sim_qd, sim_dd, 5, lambda_mult)
+
+    assert list(selected) == reference_mmr(sim_qd, sim_dd, 5, lambda_mult)
+
+
+def test_mmr_select_with_fewer_candidates_than_k():
+    sim_qd, sim_dd = similarities(3, 8, seed=1)
+
+    selected = new_app.mmr_select(sim_qd, sim_dd, 5, 0.5)
+
+    assert list(selected) == reference_mmr(sim_qd, sim_dd, 5, 0.5)
+    assert sorted(selected) == [0, 1, 2]
+
+
+def test_mmr_select_single_candidate():
+    selected = new_app.mmr_select(np.array([0.3], dtype=np.float32), np.ones((1, 1), dtype=np.float32), 5, 0.5)
+
+    assert list(selected) == [0]
+
+
+def test_mmr_select_prefers_diverse_over_duplicate():
+    # Candidates 0 and 1 are identical; MMR should pick the distinct candidate 2 second
+    emb = new_app.normalize(np.array([[1.0, 0.0], [1.0, 0.0], [0.6, 0.8]]))
+    query = new_app.normalize(np.array([1.0, 0.2]))
+
+    selected = new_app.mmr_select(emb @ query, emb @ emb.T, 2, 0.5)
+
+    assert list(selected) == [0, 2]
@@ -0,0 +1,48 @@
+import numpy as np
+
+import new_app
+
+
+def test_retriever_tool_returns_nearest_chunk_first(make_agent):
+    chunks = np.eye(8)
+    agent = make_agent(chunks, {"envy-freeness": chunks[3]})
+
+    result = agent.tools_dict["retriever_tool"].invoke("envy-freeness")
+
+    assert result.startswith("Document 1:\nchunk 3")
+
+
+def test_retriever_tool_caches_by_canonical_query(make_agent):
+    chunks = np.eye(8)
+    agent = make_agent(chunks, {"what is 1/2-mms?": chunks[2]})
+    tool = agent.tools_dict["retriever_tool"]
+
+    first = tool.invoke("What is 1/2-MMS?")
+    second = tool.invoke("  what   is 1/2-MMS?\n")
+
+    assert first == second
+    # Punctuation survives canonicalization, and the repeat is served from the cache
+    assert agent.embed_query.calls == ["what is 1/2-mms?"]
+
+
+def test_no_cutoff_returns_the_closest_chunks_however_weak(make_agent):
+    agent = make_agent(np.eye(8), {"unrelated": -np.ones(8) + 2 * np.eye(8)[2]})
+
+    assert agent._retrieve("unrelated").startswith("Document 1:\nchunk 2")
+
+
+def test_cutoff_above_every_score_returns_no_results(make_agent):
+    agent = make_agent(np.eye(8), {"unrelated": -np.ones(8) + 2 * np.eye(8)[2]})
+    agent.min_similarity = 0.5
+
+    assert agent._retrieve("unrelated") == new_app.NO_RESULTS
+
+
+def test_cutoff_keeps_only_hits_above_it(make_agent):
+    # Cosine 0.8 to chunk 0, 0.6 to chunk 1, 0 to the rest
+    agent = make_agent(np.eye(8), {"two": np.array([0.8, 0.6, 0, 0, 0, 0, 0, 0])})
+    agent.min_similarity = 0.5
+
+    docs = agent._retrieve("two").split("\n\n")
+    assert [d.splitlines()[1] for d in docs] == ["chunk 0", "chunk 1"]
+